@@ -1,9 +1,14 @@
+import time
 from typing import Dict
-from datetime import datetime
 from config import Config
 from state import State
 from executor import Executor
 
+# Ставка финансирования за секунду позиции. Считается один раз при импорте:
+# изменения Config.FUNDING_RATE / HOURS_PER_FUNDING во время работы
+# требуют перезагрузки модуля
+_FUNDING_PER_SEC = Config.FUNDING_RATE / (Config.HOURS_PER_FUNDING * 3600.0)
+
 def calculate_funding_cost(state: State) -> float:
     """
     Рассчитывает общую стоимость финансирования для всех активных хедж-позиций.
@@ -14,26 +19,19 @@ def calculate_funding_cost(state: State) -> float:
     Returns:
         float: Общая стоимость финансирования
     """
-    total_funding_cost = 0
-    current_time = datetime.now()
+    now_ts = time.time()
     
-    for hedge_num in range(1, 4):
-        hedge_key = f'h{hedge_num}'
-        if state.hedge_states[hedge_key]:
-            position_value = state.hedge_sizes[hedge_key] * state.current_price
-            entry_time = state.hedge_entry_times[hedge_key]
-            if entry_time:
-                hours_passed = (current_time - entry_time).total_seconds() / 3600
-                funding_periods = hours_passed / Config.HOURS_PER_FUNDING
-                
-                funding_cost = (
-                    position_value * 
-                    Config.FUNDING_RATE * 
-                    funding_periods
-                )
-                total_funding_cost += funding_cost
+    # Σ размер * секунды в позиции; цена и ставка общие для всех хеджей
+    # и выносятся за сумму
+    size_seconds = sum(
+        size * (now_ts - entry_ts)
+        for size, active, entry_ts in zip(
+            state.hedge_slots.sizes, state.hedge_slots.states, state.hedge_slots.entry_times
+        )
+        if active and entry_ts
+    )
     
-    return total_funding_cost
+    return size_seconds * state.current_price * _FUNDING_PER_SEC
 
 def calculate_pnl(state: State, initial_price: float) -> Dict[str, float]:
     """
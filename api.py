@@ -1,18 +1,9 @@
-import os
-from flask import Flask, render_template_string
-from dotenv import load_dotenv
-from supabase import create_client, Client
-
-load_dotenv()
+import hashlib
+import json
+from flask import Flask, Response, request
 
 app = Flask(__name__)
 
-# Initialize Supabase client
-supabase: Client = create_client(
-    os.getenv("SUPABASE_URL", ""),
-    os.getenv("SUPABASE_KEY", "")
-)
-
 # Simple HTML template
 HTML = """
 <!DOCTYPE html>
@@ -27,13 +18,28 @@ HTML = """
 </html>
 """
 
+# Страница статична, поэтому кодируем ее один раз при импорте,
+# а не рендерим шаблон на каждый запрос
+HTML_BYTES = HTML.encode("utf-8")
+HTML_ETAG = hashlib.md5(HTML_BYTES).hexdigest()
+HTML_HEADERS = {
+    "ETag": f'"{HTML_ETAG}"',
+    "Cache-Control": "public, max-age=300"
+}
+
 @app.route('/')
 def home():
-    return render_template_string(HTML)
+    # Браузер уже имеет актуальную версию - отдаем 304 без тела
+    if request.if_none_match.contains(HTML_ETAG):
+        return Response(status=304, headers=HTML_HEADERS)
+    return Response(HTML_BYTES, mimetype="text/html", headers=HTML_HEADERS)
+
+# Ответ health-check не меняется - сериализуем его один раз
+HEALTH_BYTES = json.dumps({"status": "ok"}).encode("utf-8")
 
 @app.route('/health')
 def health():
-    return {"status": "ok"}
+    return Response(HEALTH_BYTES, mimetype="application/json")
 
 if __name__ == '__main__':
     app.run() 
\ No newline at end of file
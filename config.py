@@ -1,27 +1,27 @@
-from typing import Dict
+from typing import Dict, Final
 from dataclasses import dataclass
 from enum import Enum
 
 class Config:
     # Комиссии
-    SPOT_COMMISSION = 0.001  # 0.1% для спота
-    FUTURES_COMMISSION = 0.0004  # 0.04% для фьючерсов
+    SPOT_COMMISSION: Final = 0.001  # 0.1% для спота
+    FUTURES_COMMISSION: Final = 0.0004  # 0.04% для фьючерсов
     
     # Финансирование
-    FUNDING_RATE = 0.0001  # 0.01% за 8 часов
-    HOURS_PER_FUNDING = 8
+    FUNDING_RATE: Final = 0.0001  # 0.01% за 8 часов
+    HOURS_PER_FUNDING: Final = 8
     
     # Риск-менеджмент
-    MAX_LEVERAGE = 10
+    MAX_LEVERAGE: Final = 10
     
     # Границы
-    UPPER_BOUND_MULT = 1.06  # +6%
-    LOWER_BOUND_MULT = 0.94  # -6%
-    BUFFER_MULT = 0.92      # -8%
+    UPPER_BOUND_MULT: Final = 1.06  # +6%
+    LOWER_BOUND_MULT: Final = 0.94  # -6%
+    BUFFER_MULT: Final = 0.92      # -8%
     
     # Распределение депозита
-    SPOT_ALLOCATION = 0.75   # 75% на спот
-    HEDGE_ALLOCATION = 0.25  # 25% на хедж
+    SPOT_ALLOCATION: Final = 0.75   # 75% на спот
+    HEDGE_ALLOCATION: Final = 0.25  # 25% на хедж
 
 # Strategy states для отслеживания состояния
 class StrategyState(Enum):
@@ -46,7 +46,7 @@ class ExchangeConfig:
 
 # Trading pair configuration
 class TradingPairConfig:
-    BASE_CURRENCY: str = "ETH"
-    QUOTE_CURRENCY: str = "USDT"
-    TRADING_PAIR: str = f"{BASE_CURRENCY}/{QUOTE_CURRENCY}"
-    CONTRACT_SIZE: float = 1.0 
\ No newline at end of file
+    BASE_CURRENCY: Final[str] = "ETH"
+    QUOTE_CURRENCY: Final[str] = "USDT"
+    TRADING_PAIR: Final[str] = f"{BASE_CURRENCY}/{QUOTE_CURRENCY}"
+    CONTRACT_SIZE: Final[float] = 1.0 
\ No newline at end of file
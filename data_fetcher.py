@@ -1,17 +1,89 @@
 import os
-import ccxt
+import ssl
+import time
+import asyncio
+import logging
+import weakref
+import aiohttp
+import certifi
+import orjson
+import ccxt.async_support as ccxt
+import ccxt.pro as ccxtpro
 from dotenv import load_dotenv
-from typing import Tuple, Optional
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple, Optional
 
 # Загружаем переменные окружения
 load_dotenv()
 
-def create_okx_exchange() -> ccxt.okx:
+log = logging.getLogger(__name__)
+
+# Пауза перед переподпиской после ошибки WebSocket-потока (секунды)
+STREAM_RETRY_DELAY = 1.0
+
+# Время жизни закэшированного ответа fetch_balance (секунды)
+BALANCE_CACHE_TTL = 1.5
+
+# Последний ответ fetch_balance по каждому подключению: (monotonic-время, баланс)
+_BALANCE_CACHE: "weakref.WeakKeyDictionary[ccxt.okx, Tuple[float, Dict]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+# Номер поколения кэша балансов по каждому подключению; увеличивается при
+# сбросе, чтобы ответ запроса, начатого до сброса, не попал в кэш
+_BALANCE_GENERATION: "weakref.WeakKeyDictionary[ccxt.okx, int]" = (
+    weakref.WeakKeyDictionary()
+)
+
+# Запросы к бирже, выполняющиеся прямо сейчас: ключ -> общий future
+_INFLIGHT: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+# Файл с последним ответом load_markets; {key} - идентификатор биржи
+# с суффиксом _sandbox для тестовой сети (см. _markets_cache_key).
+# /tmp - единственный каталог, доступный для записи на Vercel
+MARKETS_CACHE_PATH = '/tmp/{key}_markets.json'
+# Время жизни сохраненного списка рынков (секунды)
+MARKETS_CACHE_TTL = 24 * 3600
+
+# Рынки и валюты, уже загруженные в этом процессе: ключ кэша -> (markets, currencies)
+_MARKETS: Dict[str, Tuple[Dict, Dict]] = {}
+
+# Общая HTTP-сессия всех подключений к бирже (REST и WebSocket), чтобы
+# сканер, исполнитель и потоки данных переиспользовали соединения и TLS
+_SHARED_SESSION: Optional[aiohttp.ClientSession] = None
+
+def _get_shared_session() -> aiohttp.ClientSession:
     """
-    Создает подключение к бирже OKX с настройками из .env файла.
+    Возвращает общую aiohttp-сессию, создавая ее при первом вызове.
+    Вызывается только из работающего event loop.
+    """
+    global _SHARED_SESSION
+    if _SHARED_SESSION is None or _SHARED_SESSION.closed:
+        connector = aiohttp.TCPConnector(
+            ssl=ssl.create_default_context(cafile=certifi.where()),
+            limit=32,
+            limit_per_host=16,
+            ttl_dns_cache=300,
+            enable_cleanup_closed=True
+        )
+        _SHARED_SESSION = aiohttp.ClientSession(connector=connector)
+    return _SHARED_SESSION
+
+async def close_shared_session() -> None:
+    """
+    Закрывает общую aiohttp-сессию. Вызывается при остановке бота,
+    после закрытия всех подключений к бирже.
+    """
+    global _SHARED_SESSION
+    if _SHARED_SESSION is not None:
+        await _SHARED_SESSION.close()
+        _SHARED_SESSION = None
+
+def _okx_config() -> Tuple[Dict, bool]:
+    """
+    Собирает параметры подключения к OKX из .env файла.
     
     Returns:
-        ccxt.okx: Инстанс биржи OKX
+        Tuple[Dict, bool]: (конфигурация ccxt, флаг тестовой сети)
     """
     api_key = os.getenv('OKX_API_KEY')
     api_secret = os.getenv('OKX_SECRET_KEY')
@@ -21,24 +93,228 @@ def create_okx_exchange() -> ccxt.okx:
     if not all([api_key, api_secret, password]):
         raise ValueError("Missing API credentials in .env file")
     
-    print(f"API Key: {api_key}")
-    print(f"Secret Key: {api_secret}")
-    print(f"Password: {password}")
-    print(f"Testnet: {testnet}")
-    
-    exchange = ccxt.okx({
+    config = {
         'apiKey': api_key,
         'secret': api_secret,
         'password': password,
         'enableRateLimit': True
-    })
+    }
+    return config, testnet
+
+def create_okx_exchange() -> ccxtpro.okx:
+    """
+    Создает подключение к бирже OKX с настройками из .env файла.
+    
+    Инстанс ccxt.pro поддерживает и REST-методы ccxt.async_support,
+    и WebSocket-подписки watch_*. Все инстансы работают через общую
+    aiohttp-сессию; exchange.close() ее не закрывает (см. close_shared_session).
+    Вызывается из работающего event loop.
+    
+    Returns:
+        ccxtpro.okx: Инстанс биржи OKX
+    """
+    config, testnet = _okx_config()
+    config['session'] = _get_shared_session()
+    exchange = ccxtpro.okx(config)
     
     if testnet:
         exchange.set_sandbox_mode(True)
     
     return exchange
 
-def get_current_price(exchange: ccxt.okx, symbol: str) -> Optional[float]:
+def _markets_cache_key(exchange: ccxt.okx) -> str:
+    # set_sandbox_mode(True) сохраняет боевые URL в urls['apiBackup']
+    sandbox = 'apiBackup' in exchange.urls
+    return f"{exchange.id}{'_sandbox' if sandbox else ''}"
+
+def _read_markets_file(path: str, ttl: float) -> Optional[Tuple[Dict, Dict]]:
+    try:
+        if time.time() - os.path.getmtime(path) >= ttl:
+            return None
+        with open(path, 'rb') as f:
+            data = orjson.loads(f.read())
+        return data['markets'], data['currencies']
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _write_markets_file(path: str, markets: Dict, currencies: Dict) -> None:
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps({'markets': markets, 'currencies': currencies}))
+        os.replace(tmp_path, path)
+    except (OSError, TypeError) as e:
+        log.warning("Could not save markets cache %s: %s", path, e)
+
+async def load_markets_cached(exchange: ccxt.okx, ttl: float = MARKETS_CACHE_TTL) -> Dict:
+    """
+    Загружает рынки биржи, избегая запроса load_markets, если они уже
+    загружены в этом процессе или сохранены на диск не позднее ttl секунд назад.
+    Тестовая и боевая сети кэшируются раздельно.
+    
+    Args:
+        exchange: Инстанс биржи OKX
+        ttl: Время жизни файла с рынками в секундах
+    
+    Returns:
+        Dict: Рынки биржи (exchange.markets)
+    """
+    key = _markets_cache_key(exchange)
+    cached = _MARKETS.get(key)
+    path = MARKETS_CACHE_PATH.format(key=key)
+    if cached is None:
+        cached = _read_markets_file(path, ttl)
+    
+    if cached is not None:
+        markets, currencies = cached
+        exchange.set_markets(markets, currencies)
+    else:
+        await exchange.load_markets()
+        _write_markets_file(path, exchange.markets, exchange.currencies)
+    
+    _MARKETS[key] = (exchange.markets, exchange.currencies)
+    return exchange.markets
+
+class MarketDataClient:
+    """
+    Держит последнюю цену (и, если запрошено, балансы) по постоянным
+    WebSocket-подпискам OKX, чтобы чтение рыночных данных не требовало
+    REST-запроса.
+    """
+    
+    def __init__(self, exchange: ccxtpro.okx, symbol: str):
+        """
+        Args:
+            exchange: Инстанс ccxt.pro биржи OKX
+            symbol: Торговая пара (например, 'ETH/USDT')
+        """
+        self.exchange = exchange
+        self.symbol = symbol
+        self._last_price: Optional[float] = None
+        self._last_balance: Optional[Tuple[float, float]] = None
+        self._price_updated: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+    
+    def start(self, balance: bool = False) -> None:
+        """
+        Запускает подписку на тикер в текущем event loop.
+        
+        Args:
+            balance: Также подписаться на баланс (приватный поток,
+                требует авторизации по WebSocket)
+        """
+        if not self._tasks:
+            # Event создается внутри работающего loop, к которому он привязан
+            self._price_updated = asyncio.Event()
+            self._tasks = [asyncio.create_task(self._watch_ticker())]
+            if balance:
+                self._tasks.append(asyncio.create_task(self._watch_balance()))
+    
+    async def stop(self) -> None:
+        """Останавливает подписки и закрывает подключение к бирже."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.exchange.close()
+    
+    async def _watch_ticker(self) -> None:
+        while True:
+            try:
+                ticker = await self.exchange.watch_ticker(self.symbol)
+                self._last_price = float(ticker['last'])
+                self._price_updated.set()
+            except Exception as e:
+                log.error("Error watching ticker: %s", e)
+                await asyncio.sleep(STREAM_RETRY_DELAY)
+    
+    async def _watch_balance(self) -> None:
+        while True:
+            try:
+                balance = await self.exchange.watch_balance()
+                usdt_balance = float(balance.get('USDT', {}).get('free', 0))
+                eth_balance = float(balance.get('ETH', {}).get('free', 0))
+                self._last_balance = (usdt_balance, eth_balance)
+            except Exception as e:
+                log.error("Error watching balance: %s", e)
+                await asyncio.sleep(STREAM_RETRY_DELAY)
+    
+    def get_current_price(self) -> Optional[float]:
+        """
+        Возвращает последнюю полученную из потока цену.
+        
+        Returns:
+            Optional[float]: Цена или None, если обновлений еще не было
+        """
+        return self._last_price
+    
+    async def wait_for_price(self, timeout: float) -> Optional[float]:
+        """
+        Ждет обновления цены из потока, пришедшего после предыдущего вызова.
+        
+        Args:
+            timeout: Максимальное время ожидания в секундах
+        
+        Returns:
+            Optional[float]: Свежая цена или None, если обновления не было
+        """
+        try:
+            await asyncio.wait_for(self._price_updated.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._price_updated.clear()
+        return self._last_price
+    
+    def get_balance(self) -> Optional[Tuple[float, float]]:
+        """
+        Возвращает последние полученные из потока балансы.
+        
+        Returns:
+            Optional[Tuple[float, float]]: (USDT баланс, ETH баланс) или None,
+                если обновлений еще не было или поток баланса не запущен
+        """
+        return self._last_balance
+
+async def _coalesced(key: Hashable, request: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Объединяет одновременные одинаковые запросы: пока запрос с ключом key
+    выполняется, остальные вызовы ждут его результат вместо нового HTTP-вызова.
+    
+    Args:
+        key: Ключ запроса (подключение + тип запроса + параметры)
+        request: Фабрика корутины, выполняющей запрос
+    
+    Returns:
+        Any: Результат запроса
+    """
+    future = _INFLIGHT.get(key)
+    if future is None:
+        future = asyncio.ensure_future(request())
+        _INFLIGHT[key] = future
+        # Запись могла быть заменена новым запросом после сброса кэша
+        future.add_done_callback(
+            lambda done: _INFLIGHT.pop(key) if _INFLIGHT.get(key) is done else None
+        )
+    # shield: отмена одного ожидающего не должна отменять общий запрос
+    return await asyncio.shield(future)
+
+async def fetch_ticker_coalesced(exchange: ccxt.okx, symbol: str) -> Dict:
+    """
+    Запрашивает тикер, разделяя ответ между одновременными вызовами.
+    
+    Args:
+        exchange: Инстанс биржи OKX
+        symbol: Торговая пара (например, 'ETH/USDT')
+    
+    Returns:
+        Dict: Ответ fetch_ticker
+    """
+    return await _coalesced(
+        (exchange, 'ticker', symbol),
+        lambda: exchange.fetch_ticker(symbol)
+    )
+
+async def get_current_price(exchange: ccxt.okx, symbol: str) -> Optional[float]:
     """
     Получает текущую цену торговой пары.
     
@@ -50,13 +326,47 @@ def get_current_price(exchange: ccxt.okx, symbol: str) -> Optional[float]:
         Optional[float]: Текущая цена или None в случае ошибки
     """
     try:
-        ticker = exchange.fetch_ticker(symbol)
+        ticker = await fetch_ticker_coalesced(exchange, symbol)
         return float(ticker['last'])
     except Exception as e:
-        print(f"Error fetching price: {str(e)}")
+        log.error("Error fetching price: %s", e)
         return None
 
-def get_balance(exchange: ccxt.okx) -> Tuple[float, float]:
+async def fetch_balance_cached(exchange: ccxt.okx, ttl: float = BALANCE_CACHE_TTL) -> Dict:
+    """
+    Возвращает ответ fetch_balance, переиспользуя его в пределах ttl секунд.
+    
+    Args:
+        exchange: Инстанс биржи OKX
+        ttl: Время жизни кэша в секундах
+    
+    Returns:
+        Dict: Ответ fetch_balance
+    """
+    cached = _BALANCE_CACHE.get(exchange)
+    if cached is not None and time.monotonic() - cached[0] < ttl:
+        return cached[1]
+    
+    generation = _BALANCE_GENERATION.get(exchange, 0)
+    balance = await _coalesced((exchange, 'balance'), exchange.fetch_balance)
+    if _BALANCE_GENERATION.get(exchange, 0) == generation:
+        _BALANCE_CACHE[exchange] = (time.monotonic(), balance)
+    return balance
+
+def invalidate_balance_cache(exchange: ccxt.okx) -> None:
+    """
+    Сбрасывает кэш балансов подключения - вызывается после исполнения ордера.
+    Запрос, начатый до сброса, не сохранит свой ответ в кэш, а следующий
+    вызов fetch_balance_cached не присоединится к нему.
+    
+    Args:
+        exchange: Инстанс биржи OKX
+    """
+    _BALANCE_GENERATION[exchange] = _BALANCE_GENERATION.get(exchange, 0) + 1
+    _BALANCE_CACHE.pop(exchange, None)
+    _INFLIGHT.pop((exchange, 'balance'), None)
+
+async def get_balance(exchange: ccxt.okx) -> Tuple[float, float]:
     """
     Получает текущие балансы USDT и ETH.
     
@@ -67,38 +377,43 @@ def get_balance(exchange: ccxt.okx) -> Tuple[float, float]:
         Tuple[float, float]: (USDT баланс, ETH баланс)
     """
     try:
-        balance = exchange.fetch_balance()
+        balance = await fetch_balance_cached(exchange)
         
         # Получаем только доступные (не в ордерах) балансы
         usdt_balance = float(balance.get('USDT', {}).get('free', 0))
         eth_balance = float(balance.get('ETH', {}).get('free', 0))
         
-        print(f"Fetched balances - USDT: ${usdt_balance:.2f}, ETH: {eth_balance:.6f}")
+        log.info("Fetched balances - USDT: $%.2f, ETH: %.6f", usdt_balance, eth_balance)
         return usdt_balance, eth_balance
         
     except Exception as e:
-        print(f"Error fetching balance: {str(e)}")
+        log.error("Error fetching balance: %s", e)
         return 0.0, 0.0
 
-if __name__ == "__main__":
+async def _demo() -> None:
+    # Создаем подключение к бирже
+    exchange = create_okx_exchange()
     try:
-        # Создаем подключение к бирже
-        exchange = create_okx_exchange()
-        
-        # Проверяем подключение
-        print("\nTesting exchange connection...")
-        exchange.load_markets()
-        print("Connection successful!")
+        # Рынки могут быть взяты из кэша без обращения к бирже
+        await load_markets_cached(exchange)
+        print("\nMarkets loaded")
         
         # Получаем текущую цену ETH
         symbol = 'ETH/USDT'
-        price = get_current_price(exchange, symbol)
+        price = await get_current_price(exchange, symbol)
         print(f"\nCurrent {symbol} price: ${price:.2f}")
         
         # Получаем балансы
-        usdt_balance, eth_balance = get_balance(exchange)
+        usdt_balance, eth_balance = await get_balance(exchange)
         print(f"USDT balance: ${usdt_balance:.2f}")
         print(f"ETH balance: {eth_balance:.6f} (${eth_balance * price:.2f})")
-        
+    finally:
+        await exchange.close()
+        await close_shared_session()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_demo())
     except Exception as e:
-        print(f"Error in main: {str(e)}") 
\ No newline at end of file
+        print(f"Error in main: {str(e)}")
@@ -1,22 +1,187 @@
-import ccxt
-import time
+import asyncio
+import logging
+import ccxt.async_support as ccxt
+import ccxt.pro as ccxtpro
+from collections import OrderedDict
 from typing import Dict, Optional
-from datetime import datetime
-from data_fetcher import create_okx_exchange
+from data_fetcher import (
+    close_shared_session,
+    create_okx_exchange,
+    fetch_balance_cached,
+    fetch_ticker_coalesced,
+    invalidate_balance_cache
+)
 from config import Config, TradingPairConfig
 
+log = logging.getLogger(__name__)
+
+# Интервал опроса fetch_order, идущего параллельно с WebSocket-потоком (секунды)
+ORDER_POLL_INTERVAL = 0.5
+# Сколько временных ошибок fetch_order подряд допускается при опросе
+ORDER_POLL_MAX_ERRORS = 5
+# Сколько ждать исполнения из WebSocket-потока, если опрос REST не удался (секунды)
+ORDER_STREAM_TIMEOUT = 10.0
+# Пауза перед переподпиской на ордера после ошибки (секунды);
+# удваивается после каждой следующей ошибки подряд
+ORDER_WATCH_RETRY_DELAY = 1.0
+# После стольких ошибок подряд подписка останавливается до следующего
+# ордера - исполнение отслеживается опросом fetch_order
+ORDER_WATCH_MAX_FAILURES = 5
+# Сколько исполненных ордеров помнить для ожидающих, подписавшихся позже
+CLOSED_ORDERS_CACHE_SIZE = 100
+
 class Executor:
     """
     Выполняет торговые операции на бирже OKX.
     """
     
-    def __init__(self):
-        """Инициализирует экземпляр Executor с подключением к OKX."""
-        self.exchange = create_okx_exchange()
+    def __init__(self, exchange: Optional[ccxtpro.okx] = None):
+        """
+        Инициализирует экземпляр Executor с подключением к OKX.
+        
+        Args:
+            exchange: Готовое подключение к бирже; если не передано,
+                создается новое
+        """
+        # Подключение, созданное здесь, закрывается в close()
+        self._owns_exchange = exchange is None
+        self.exchange = exchange or create_okx_exchange()
         self.symbol = TradingPairConfig.TRADING_PAIR
         self.total_commission = 0.0
         
-    def _create_market_order(self, side: str, amount: float) -> Dict:
+        # Одна подписка watch_orders на все ордера исполнителя
+        self._orders_task: Optional[asyncio.Task] = None
+        self._fill_waiters: Dict[str, asyncio.Future] = {}
+        self._closed_orders: "OrderedDict[str, Dict]" = OrderedDict()
+        
+        # Проверка баланса для каждой стороны ордера
+        self._balance_checks = {
+            'buy': self._check_buy_balance,
+            'sell': self._check_sell_balance
+        }
+    
+    async def close(self) -> None:
+        """Останавливает подписку на ордера и закрывает собственное подключение."""
+        if self._orders_task is not None:
+            self._orders_task.cancel()
+            await asyncio.gather(self._orders_task, return_exceptions=True)
+            self._orders_task = None
+        if self._owns_exchange:
+            await self.exchange.close()
+    
+    @staticmethod
+    def _check_buy_balance(balance: Dict, amount: float, price: float) -> None:
+        quote_balance = balance['USDT']['free']
+        required_amount = amount * price
+        if quote_balance < required_amount:
+            raise ValueError(f"Insufficient USDT balance. Required: {required_amount}, Available: {quote_balance}")
+    
+    @staticmethod
+    def _check_sell_balance(balance: Dict, amount: float, price: float) -> None:
+        base_balance = balance['ETH']['free']
+        if base_balance < amount:
+            raise ValueError(f"Insufficient ETH balance. Required: {amount}, Available: {base_balance}")
+    
+    def _ensure_order_watcher(self) -> None:
+        """Запускает подписку на ордера, если она еще не работает."""
+        if self._orders_task is None or self._orders_task.done():
+            self._orders_task = asyncio.create_task(self._watch_orders())
+    
+    async def _watch_orders(self) -> None:
+        failures = 0
+        while True:
+            try:
+                orders = await self.exchange.watch_orders(self.symbol)
+            except Exception as e:
+                failures += 1
+                if failures >= ORDER_WATCH_MAX_FAILURES:
+                    log.error("Error watching orders: %s; stopping the order stream, "
+                              "fills are tracked by polling", e)
+                    return
+                delay = ORDER_WATCH_RETRY_DELAY * 2 ** (failures - 1)
+                log.warning("Error watching orders: %s; retrying in %.0fs", e, delay)
+                await asyncio.sleep(delay)
+                continue
+            failures = 0
+            
+            for order in orders:
+                if order['status'] != 'closed':
+                    continue
+                waiter = self._fill_waiters.pop(order['id'], None)
+                if waiter is not None:
+                    if not waiter.done():
+                        waiter.set_result(order)
+                    continue
+                # Ордер мог исполниться раньше, чем create_order вернул ответ
+                self._closed_orders[order['id']] = order
+                if len(self._closed_orders) > CLOSED_ORDERS_CACHE_SIZE:
+                    self._closed_orders.popitem(last=False)
+    
+    async def _poll_fill(self, order_id: str) -> Dict:
+        """
+        Опрашивает fetch_order, пока ордер не исполнится. Сетевые ошибки и
+        OrderNotFound (только что созданный ордер может быть еще не виден
+        через REST) повторяются до ORDER_POLL_MAX_ERRORS раз подряд.
+        """
+        errors = 0
+        while True:
+            try:
+                order_status = await self.exchange.fetch_order(order_id, self.symbol)
+            except (ccxt.NetworkError, ccxt.OrderNotFound) as e:
+                errors += 1
+                if errors >= ORDER_POLL_MAX_ERRORS:
+                    raise
+                log.warning("Error polling order %s: %s", order_id, e)
+            else:
+                errors = 0
+                if order_status['status'] == 'closed':
+                    return order_status
+            await asyncio.sleep(ORDER_POLL_INTERVAL)
+    
+    async def _wait_for_fill(self, order_id: str) -> Dict:
+        """
+        Ждет исполнения ордера по WebSocket-потоку и одновременно опрашивает
+        REST: подписка может еще не установиться к моменту исполнения.
+        Возвращается тот результат, что пришел первым. Если опрос REST
+        завершился ошибкой, ожидание продолжается по потоку; ошибка
+        выбрасывается, только когда исполнение не пришло и оттуда.
+        
+        Args:
+            order_id: Идентификатор ордера
+            
+        Returns:
+            Dict: Информация об исполненном ордере
+        """
+        order_status = self._closed_orders.pop(order_id, None)
+        if order_status is not None:
+            return order_status
+        
+        waiter = asyncio.get_running_loop().create_future()
+        self._fill_waiters[order_id] = waiter
+        poller = asyncio.ensure_future(self._poll_fill(order_id))
+        try:
+            await asyncio.wait((waiter, poller), return_when=asyncio.FIRST_COMPLETED)
+            if waiter.done():
+                return waiter.result()
+            if poller.exception() is None:
+                return poller.result()
+            
+            # Опрос не удался, но ордер мог исполниться - ждем поток ордеров
+            log.warning("Polling order %s failed: %s; waiting for the order stream",
+                        order_id, poller.exception())
+            if self._orders_task is None or self._orders_task.done():
+                raise poller.exception()
+            try:
+                return await asyncio.wait_for(waiter, ORDER_STREAM_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise poller.exception() from None
+        finally:
+            self._fill_waiters.pop(order_id, None)
+            waiter.cancel()
+            poller.cancel()
+            await asyncio.gather(poller, return_exceptions=True)
+        
+    async def _create_market_order(self, side: str, amount: float) -> Dict:
         """
         Создает рыночный ордер с указанными параметрами.
         
@@ -31,23 +196,26 @@ class Executor:
             # Проверяем подключение к бирже
             if not self.exchange:
                 raise ValueError("No exchange connection")
-                
-            # Получаем текущую цену
-            current_price = self.exchange.fetch_ticker(self.symbol)['last']
+            
+            check_balance = self._balance_checks.get(side)
+            if check_balance is None:
+                raise ValueError(f"Unknown order side: {side}")
+            
+            # Подписка успевает установиться, пока идут проверки ниже
+            self._ensure_order_watcher()
+            
+            # Цена и баланс независимы - запрашиваем их параллельно
+            ticker, balance = await asyncio.gather(
+                fetch_ticker_coalesced(self.exchange, self.symbol),
+                fetch_balance_cached(self.exchange)
+            )
+            current_price = ticker['last']
             
             # Проверяем баланс перед созданием ордера
-            if side == 'buy':
-                quote_balance = self.exchange.fetch_balance()['USDT']['free']
-                required_amount = amount * current_price
-                if quote_balance < required_amount:
-                    raise ValueError(f"Insufficient USDT balance. Required: {required_amount}, Available: {quote_balance}")
-            else:  # sell
-                base_balance = self.exchange.fetch_balance()['ETH']['free']
-                if base_balance < amount:
-                    raise ValueError(f"Insufficient ETH balance. Required: {amount}, Available: {base_balance}")
+            check_balance(balance, amount, current_price)
             
             # Создаем ордер
-            order = self.exchange.create_order(
+            order = await self.exchange.create_order(
                 symbol=self.symbol,
                 type='market',
                 side=side,
@@ -55,35 +223,38 @@ class Executor:
                 params={'tdMode': 'cash'}  # Используем спотовый режим
             )
             
-            print(f"Creating {side} order: {amount:.6f} {self.symbol} at ~${current_price:.2f}")
+            log.info("Creating %s order: %.6f %s at ~$%.2f", side, amount, self.symbol, current_price)
             
-            # Ждем исполнения ордера
-            while True:
-                order_status = self.exchange.fetch_order(order['id'], self.symbol)
-                if order_status['status'] == 'closed':
-                    break
-                time.sleep(0.5)
+            try:
+                # Ждем исполнения ордера
+                order_status = await self._wait_for_fill(order['id'])
+            finally:
+                # Ордер создан, балансы изменились или вот-вот изменятся -
+                # следующий запрос должен идти на биржу, даже если ожидание
+                # исполнения завершилось ошибкой
+                invalidate_balance_cache(self.exchange)
             
             # Получаем комиссию из исполненного ордера
             if 'fee' in order_status and order_status['fee'] is not None:
                 fee_cost = float(order_status['fee']['cost'])
                 self.total_commission += fee_cost
-                print(f"Order executed. Fee: ${fee_cost:.4f}")
-                print(f"Total commission so far: ${self.total_commission:.4f}")
+                log.info("Order executed. Fee: $%.4f. Total commission so far: $%.4f",
+                         fee_cost, self.total_commission)
             
             # Выводим информацию об исполненном ордере
             executed_price = float(order_status['average'])
             executed_amount = float(order_status['filled'])
             executed_value = executed_price * executed_amount
-            print(f"Order filled: {executed_amount:.6f} {self.symbol} @ ${executed_price:.2f} (Total: ${executed_value:.2f})")
+            log.info("Order filled: %.6f %s @ $%.2f (Total: $%.2f)",
+                     executed_amount, self.symbol, executed_price, executed_value)
             
             return order_status
             
         except Exception as e:
-            print(f"Error creating {side} order: {str(e)}")
+            log.error("Error creating %s order: %s", side, e)
             raise
     
-    def buy_eth(self, price: float, amount: float) -> Dict:
+    async def buy_eth(self, price: float, amount: float) -> Dict:
         """
         Создает рыночный ордер на покупку ETH.
         
@@ -94,10 +265,10 @@ class Executor:
         Returns:
             Dict: Информация об исполненном ордере
         """
-        print(f"Buying {amount} ETH at market price (currently {price:.2f})")
-        return self._create_market_order('buy', amount)
+        log.info("Buying %s ETH at market price (currently %.2f)", amount, price)
+        return await self._create_market_order('buy', amount)
     
-    def sell_eth(self, price: float, amount: float) -> Dict:
+    async def sell_eth(self, price: float, amount: float) -> Dict:
         """
         Создает рыночный ордер на продажу ETH.
         
@@ -108,10 +279,10 @@ class Executor:
         Returns:
             Dict: Информация об исполненном ордере
         """
-        print(f"Selling {amount} ETH at market price (currently {price:.2f})")
-        return self._create_market_order('sell', amount)
+        log.info("Selling %s ETH at market price (currently %.2f)", amount, price)
+        return await self._create_market_order('sell', amount)
     
-    def open_hedge(self, price: float, amount: float) -> Dict:
+    async def open_hedge(self, price: float, amount: float) -> Dict:
         """
         Открывает хедж-позицию через рыночный ордер на продажу.
         
@@ -122,10 +293,10 @@ class Executor:
         Returns:
             Dict: Информация об исполненном ордере
         """
-        print(f"Opening hedge position: Selling {amount} ETH at market price (currently {price:.2f})")
-        return self._create_market_order('sell', amount)
+        log.info("Opening hedge position: Selling %s ETH at market price (currently %.2f)", amount, price)
+        return await self._create_market_order('sell', amount)
     
-    def close_hedge(self, price: float, amount: float) -> Dict:
+    async def close_hedge(self, price: float, amount: float) -> Dict:
         """
         Закрывает хедж-позицию через рыночный ордер на покупку.
         
@@ -136,10 +307,10 @@ class Executor:
         Returns:
             Dict: Информация об исполненном ордере
         """
-        print(f"Closing hedge position: Buying {amount} ETH at market price (currently {price:.2f})")
-        return self._create_market_order('buy', amount)
+        log.info("Closing hedge position: Buying %s ETH at market price (currently %.2f)", amount, price)
+        return await self._create_market_order('buy', amount)
     
-    def close_all_hedges(self, price: float, amount: float) -> Dict:
+    async def close_all_hedges(self, price: float, amount: float) -> Dict:
         """
         Закрывает все хедж-позиции одним рыночным ордером.
         
@@ -150,10 +321,10 @@ class Executor:
         Returns:
             Dict: Информация об исполненном ордере
         """
-        print(f"Closing all hedge positions: Buying {amount} ETH at market price (currently {price:.2f})")
-        return self._create_market_order('buy', amount)
+        log.info("Closing all hedge positions: Buying %s ETH at market price (currently %.2f)", amount, price)
+        return await self._create_market_order('buy', amount)
     
-    def sell_all_eth(self, price: float, amount: float) -> Dict:
+    async def sell_all_eth(self, price: float, amount: float) -> Dict:
         """
         Продает весь имеющийся ETH одним рыночным ордером.
         
@@ -164,36 +335,43 @@ class Executor:
         Returns:
             Dict: Информация об исполненном ордере
         """
-        print(f"Selling all ETH: {amount} ETH at market price (currently {price:.2f})")
-        return self._create_market_order('sell', amount)
+        log.info("Selling all ETH: %s ETH at market price (currently %.2f)", amount, price)
+        return await self._create_market_order('sell', amount)
     
     def get_total_commission(self) -> float:
         """Возвращает общую сумму комиссий."""
         return self.total_commission
 
-if __name__ == "__main__":
-    # Пример использования
+async def _demo() -> None:
+    # Создаем экземпляр исполнителя
+    executor = Executor()
+    
     try:
-        # Создаем экземпляр исполнителя
-        executor = Executor()
-        
         # Тестовые значения
         current_price = 2000.0  # Пример цены ETH
         trade_amount = 0.1     # Пример объема сделки
         
         # Тестируем покупку и продажу
-        buy_order = executor.buy_eth(current_price, trade_amount)
+        buy_order = await executor.buy_eth(current_price, trade_amount)
         print(f"Buy order created: {buy_order}\n")
         
-        sell_order = executor.sell_eth(current_price, trade_amount)
+        sell_order = await executor.sell_eth(current_price, trade_amount)
         print(f"Sell order created: {sell_order}\n")
         
         # Тестируем операции с хеджами
-        hedge_order = executor.open_hedge(current_price, trade_amount)
+        hedge_order = await executor.open_hedge(current_price, trade_amount)
         print(f"Hedge order created: {hedge_order}\n")
         
-        close_hedge_order = executor.close_hedge(current_price, trade_amount)
+        close_hedge_order = await executor.close_hedge(current_price, trade_amount)
         print(f"Close hedge order created: {close_hedge_order}")
-        
+    finally:
+        await executor.close()
+        await close_shared_session()
+
+if __name__ == "__main__":
+    # Пример использования
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_demo())
     except Exception as e:
-        print(f"Error in main: {str(e)}") 
\ No newline at end of file
+        print(f"Error in main: {str(e)}")
@@ -1,8 +1,16 @@
-import time
+import logging
+import logging.handlers
+import queue
 from typing import Optional, Dict
 from datetime import datetime
-from data_fetcher import create_okx_exchange, get_current_price, get_balance
-from scanner import scan_market
+from data_fetcher import (
+    create_okx_exchange,
+    close_shared_session,
+    get_current_price,
+    get_balance,
+    load_markets_cached
+)
+from scanner import latest_price, price_stream, close_scanner
 from strategy import (
     initialize_strategy,
     manage_hedges,
@@ -19,39 +27,89 @@ import asyncio
 
 # Trading parameters
 SYMBOL = TradingPairConfig.TRADING_PAIR
-SLEEP_TIME = 10  # Sleep time in seconds between iterations
+ERROR_SLEEP_TIME = 10  # Pause in seconds after a failed iteration
+# Minimum pause in seconds between main_loop runs. main_loop rebalances on
+# every run with the price in (buffer, entry * 1.01], so it must not run on
+# every streamed tick; this keeps the old 10 s polling cadence as a ceiling
+MIN_LOOP_INTERVAL = 10
 STATUS_INTERVAL = 3600  # Status update interval in seconds
 
+log = logging.getLogger(__name__)
+
+def setup_logging(level: int = logging.INFO) -> logging.handlers.QueueListener:
+    """
+    Настраивает логирование через очередь: event loop только кладет записи
+    в очередь, а запись в stderr выполняет фоновый поток QueueListener.
+    
+    Returns:
+        logging.handlers.QueueListener: Запущенный слушатель (остановить при выходе)
+    """
+    log_queue: queue.Queue = queue.Queue(-1)
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    
+    listener.start()
+    return listener
+
 async def print_strategy_info(state: State, pnl: Dict[str, float], message: str, initial_price: float, logger=None) -> None:
     """
     Выводит подробную информацию о состоянии стратегии.
     """
-    print(f"\n=== {message} ===")
-    print(f"Текущая цена: ${state.current_price:.2f}")
-    print(f"Изменение цены: {((state.current_price - initial_price) / initial_price * 100):.2f}%")
-    print(f"ETH баланс: {state.current_eth:.6f} ETH (${state.current_eth * state.current_price:.2f})")
-    print(f"USDT баланс: ${state.current_usd:.2f}")
-    print(f"P&L: ${pnl['total']:.2f} ({pnl['percentage']:.2f}%)")
-    
-    if logger:
-        await logger.update_state(state)
-        await logger.log_pnl(pnl)
+    # Собираем блок целиком и пишем в лог одной записью
+    lines = [
+        f"=== {message} ===",
+        f"Текущая цена: ${state.current_price:.2f}",
+        f"Изменение цены: {((state.current_price - initial_price) / initial_price * 100):.2f}%",
+        f"ETH баланс: {state.current_eth:.6f} ETH (${state.current_eth * state.current_price:.2f})",
+        f"USDT баланс: ${state.current_usd:.2f}",
+        f"P&L: ${pnl['total']:.2f} ({pnl['percentage']:.2f}%)"
+    ]
     
     if state.hedges:
-        print("\nАктивные хеджи:")
+        lines.append("Активные хеджи:")
         for hedge_num, hedge in state.hedges.items():
-            print(f"Хедж {hedge_num}: {hedge['size']:.4f} контрактов по ${hedge['price']:.2f}")
-        
-        if logger:
-            await logger.log_hedges(state.hedges)
+            lines.append(f"Хедж {hedge_num}: {hedge['size']:.4f} контрактов по ${hedge['price']:.2f}")
+    
+    lines.append("=" * 50)
+    log.info("\n".join(lines))
     
-    print("=" * 50 + "\n")
+    # Записи в логгер независимы - отправляем их параллельно
+    if logger:
+        writes = [logger.update_state(state), logger.log_pnl(pnl)]
+        if state.hedges:
+            writes.append(logger.log_hedges(state.hedges))
+        await asyncio.gather(*writes)
+
+async def report_status(state: State, exchange, initial_price: float, logger=None) -> None:
+    """
+    Раз в STATUS_INTERVAL обновляет балансы и выводит статус стратегии.
+    """
+    while True:
+        await asyncio.sleep(STATUS_INTERVAL)
+        try:
+            usdt_balance, eth_balance = await get_balance(exchange)
+            state.update_balances(eth_balance, usdt_balance)
+            pnl = calculate_pnl(state, initial_price)
+            await print_strategy_info(state, pnl, "Периодический статус", initial_price, logger)
+        except Exception as e:
+            log.error("Ошибка при обновлении статуса: %s", e)
 
 async def main_loop(state: State, current_price: float, executor: Executor, initial_price: float, logger=None) -> State:
     """
     Основной цикл торговой стратегии.
     """
     state.current_price = current_price
+    
+    # Выше entry * 1.01 ни одно из условий ниже не выполняется
+    if current_price > state.entry_price * 1.01:
+        return state
+    
     last_action = None
     action_type = None
 
@@ -90,27 +148,32 @@ async def main(logger=None):
     """
     Основная функция торгового бота.
     """
+    exchange = None
+    executor = None
     try:
-        print("\n=== Инициализация торговой стратегии ===")
+        log.info("=== Инициализация торговой стратегии ===")
         if logger:
             await logger.write("Инициализация торговой стратегии", log_type='info', action='init')
         
-        # Создаем подключение к бирже
+        # Создаем подключение к бирже; рынки могут быть взяты из кэша
+        # без обращения к бирже
         exchange = create_okx_exchange()
-        print("Проверка подключения к бирже...")
-        await exchange.load_markets()
-        print("Подключение успешно!")
-        
-        if logger:
-            await logger.write("Подключение к бирже успешно", log_type='info', action='connect')
+        await load_markets_cached(exchange)
+        log.info("Рынки загружены")
         
         # Создаем исполнителя
         executor = Executor(exchange)
         
-        # Получаем начальные данные
+        # Получаем начальные данные - первый запрос к бирже служит
+        # проверкой подключения
+        log.info("Проверка подключения к бирже...")
         current_price = await get_current_price(exchange, SYMBOL)
         if not current_price:
             raise Exception("Не удалось получить текущую цену")
+        log.info("Подключение успешно!")
+        
+        if logger:
+            await logger.write("Подключение к бирже успешно", log_type='info', action='connect')
         
         usdt_balance, eth_balance = await get_balance(exchange)
         initial_deposit = usdt_balance + (eth_balance * current_price)
@@ -119,72 +182,98 @@ async def main(logger=None):
         state = initialize_strategy(current_price, initial_deposit)
         state.update_balances(eth_balance, usdt_balance)
         
-        print(f"\nНачальные параметры:")
-        print(f"Цена ETH: ${current_price:.2f}")
-        print(f"Общий депозит: ${initial_deposit:.2f}")
-        print(f"USDT баланс: ${usdt_balance:.2f}")
-        print(f"ETH баланс: {eth_balance:.6f} (${eth_balance * current_price:.2f})")
+        log.info(
+            "Начальные параметры:\n"
+            "Цена ETH: $%.2f\n"
+            "Общий депозит: $%.2f\n"
+            "USDT баланс: $%.2f\n"
+            "ETH баланс: %.6f ($%.2f)",
+            current_price, initial_deposit, usdt_balance,
+            eth_balance, eth_balance * current_price
+        )
         
         # Выполняем начальную покупку ETH
         if eth_balance < state.initial_eth:
             eth_to_buy = state.initial_eth - eth_balance
-            print(f"\n=== Выполняем начальную покупку {eth_to_buy:.6f} ETH ===")
+            log.info("=== Выполняем начальную покупку %.6f ETH ===", eth_to_buy)
             await executor.buy_eth(current_price, eth_to_buy)
             
             # Обновляем балансы после покупки
             usdt_balance, eth_balance = await get_balance(exchange)
             state.update_balances(eth_balance, usdt_balance)
             
-            print(f"Новый ETH баланс: {eth_balance:.6f} ETH (${eth_balance * current_price:.2f})")
-            print(f"Новый USDT баланс: ${usdt_balance:.2f}")
+            log.info(
+                "Новый ETH баланс: %.6f ETH ($%.2f)\nНовый USDT баланс: $%.2f",
+                eth_balance, eth_balance * current_price, usdt_balance
+            )
         
-        print("=== Стратегия инициализирована ===\n")
+        log.info("=== Стратегия инициализирована ===")
         
-        # Основной торговый цикл
-        last_status_time = time.time()
+        # Периодический статус работает отдельно от реакции на цену
         initial_price = current_price
+        status_task = asyncio.create_task(
+            report_status(state, exchange, initial_price, logger)
+        )
         
-        while True:
-            try:
-                current_time = time.time()
-                
-                # Получаем текущие данные рынка
-                current_price = await scan_market(SYMBOL)
-                if not current_price:
-                    error_msg = "Предупреждение: Не удалось получить текущую цену, пропускаем итерацию"
-                    print(error_msg)
+        # Основной торговый цикл: итерация на значимое изменение цены,
+        # но не чаще MIN_LOOP_INTERVAL. Резервные REST-запросы сканера идут
+        # через то же подключение, что и у исполнителя, и объединяются с ними
+        loop = asyncio.get_running_loop()
+        last_run = float('-inf')
+        try:
+            async for current_price in price_stream(SYMBOL, exchange=exchange):
+                try:
+                    if not current_price:
+                        error_msg = "Предупреждение: Не удалось получить текущую цену, пропускаем итерацию"
+                        log.warning(error_msg)
+                        if logger:
+                            await logger.write(error_msg, log_type='warning', action='market_scan')
+                        continue
+                    
+                    # Цена пришла слишком рано - ждем и берем самую свежую
+                    wait = last_run + MIN_LOOP_INTERVAL - loop.time()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                        current_price = latest_price(SYMBOL) or current_price
+                    last_run = loop.time()
+                    
+                    state = await main_loop(state, current_price, executor, initial_price, logger)
+                    
+                except Exception as e:
+                    error_msg = f"Ошибка в торговом цикле: {str(e)}"
+                    log.error(error_msg)
                     if logger:
-                        await logger.write(error_msg, log_type='warning', action='market_scan')
-                    continue
-                
-                # Получаем текущие балансы только если прошел интервал или была торговля
-                if current_time - last_status_time >= STATUS_INTERVAL:
-                    usdt_balance, eth_balance = await get_balance(exchange)
-                    state.update_balances(eth_balance, usdt_balance)
-                    pnl = calculate_pnl(state, initial_price)
-                    await print_strategy_info(state, pnl, "Периодический статус", initial_price, logger)
-                    last_status_time = current_time
-                
-                # Выполняем основной цикл
-                state = await main_loop(state, current_price, executor, initial_price, logger)
-                
-                # Пауза перед следующей итерацией
-                await asyncio.sleep(SLEEP_TIME)
-                
-            except Exception as e:
-                error_msg = f"Ошибка в торговом цикле: {str(e)}"
-                print(error_msg)
-                if logger:
-                    await logger.write(error_msg, log_type='error', action='trading_loop', is_error=True)
-                await asyncio.sleep(SLEEP_TIME)
-                continue
+                        await logger.write(error_msg, log_type='error', action='trading_loop', is_error=True)
+                    await asyncio.sleep(ERROR_SLEEP_TIME)
+        finally:
+            status_task.cancel()
     
     except Exception as e:
         error_msg = f"Критическая ошибка: {str(e)}"
-        print(error_msg)
+        log.error(error_msg)
         if logger:
             await logger.write(error_msg, log_type='error', action='critical', is_error=True)
         return
+    
+    finally:
+        # Освобождаем подписки и aiohttp-сессии ccxt
+        if executor is not None:
+            await executor.close()
+        if exchange is not None:
+            await exchange.close()
+        await close_scanner()
+        await close_shared_session()
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    # uvloop - более быстрый event loop; на Windows недоступен
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
+    listener = setup_logging()
+    try:
+        asyncio.run(main())
+    finally:
+        listener.stop() 
\ No newline at end of file
@@ -1,25 +1,110 @@
-from typing import Optional
-from data_fetcher import create_okx_exchange, get_current_price
+import asyncio
+import logging
+import ccxt.async_support as ccxt
+from typing import AsyncIterator, Dict, Optional
+from data_fetcher import (
+    MarketDataClient,
+    close_shared_session,
+    create_okx_exchange,
+    get_current_price,
+    load_markets_cached
+)
 from config import TradingPairConfig
 
-def scan_market(symbol: str) -> Optional[float]:
+log = logging.getLogger(__name__)
+
+# How long to wait for a streamed price before falling back to REST (seconds)
+STREAM_TIMEOUT = 5.0
+
+# Relative price move below which price_stream does not yield (1 bp)
+PRICE_STREAM_MIN_CHANGE = 0.0001
+
+# Pause after a failed scan before price_stream retries (seconds)
+PRICE_STREAM_RETRY_DELAY = 1.0
+
+# One WebSocket price stream per symbol, started on first scan
+_STREAMS: Dict[str, MarketDataClient] = {}
+
+# REST exchange for the fallback path, created once and reused
+_EXCHANGE: Optional[ccxt.okx] = None
+
+async def _get_stream(symbol: str) -> MarketDataClient:
+    stream = _STREAMS.get(symbol)
+    if stream is None:
+        exchange = create_okx_exchange()
+        # watch_ticker would otherwise call load_markets over the network
+        await load_markets_cached(exchange)
+        stream = _STREAMS.get(symbol)
+        if stream is not None:
+            # Another caller started the stream while markets were loading
+            await exchange.close()
+            return stream
+        stream = MarketDataClient(exchange, symbol)
+        stream.start()
+        _STREAMS[symbol] = stream
+    return stream
+
+def latest_price(symbol: str) -> Optional[float]:
+    """
+    Returns the most recent streamed price for symbol without waiting.
+    
+    Args:
+        symbol: Trading pair symbol (e.g., 'BTC/USDT')
+    
+    Returns:
+        Optional[float]: Last streamed price, None if no stream or update yet
+    """
+    stream = _STREAMS.get(symbol)
+    return stream.get_current_price() if stream is not None else None
+
+async def _get_exchange() -> ccxt.okx:
+    global _EXCHANGE
+    if _EXCHANGE is None:
+        _EXCHANGE = create_okx_exchange()
+        await load_markets_cached(_EXCHANGE)
+    return _EXCHANGE
+
+async def close_scanner() -> None:
+    """
+    Stops all price streams and closes the fallback REST exchange.
+    Call once on shutdown so ccxt releases its aiohttp sessions.
+    """
+    global _EXCHANGE
+    streams = list(_STREAMS.values())
+    _STREAMS.clear()
+    for stream in streams:
+        await stream.stop()
+    if _EXCHANGE is not None:
+        await _EXCHANGE.close()
+        _EXCHANGE = None
+
+async def scan_market(symbol: str, exchange: Optional[ccxt.okx] = None) -> Optional[float]:
     """
     Scans the market for the current price of a given symbol.
-    This is a basic implementation that only fetches the current price.
+    The price comes from a persistent WebSocket ticker stream; REST is
+    only used when the stream has produced no update within STREAM_TIMEOUT.
     More complex scanning logic will be added later.
     
     Args:
         symbol: Trading pair symbol (e.g., 'BTC/USDT')
+        exchange: Exchange for the REST fallback; passing the caller's own
+            instance lets its ticker requests coalesce with the caller's.
+            Defaults to the scanner's shared instance
     
     Returns:
         Optional[float]: Current price if available, None if there's an error
     """
     try:
-        # Create exchange instance
-        exchange = create_okx_exchange()
+        # Take the latest streamed price if one has arrived
+        stream = await _get_stream(symbol)
+        current_price = await stream.wait_for_price(STREAM_TIMEOUT)
+        if current_price:
+            return current_price
         
-        # Get current price
-        current_price = get_current_price(exchange, symbol)
+        # Fall back to REST on the caller's or the shared exchange instance
+        if exchange is None:
+            exchange = await _get_exchange()
+        current_price = await get_current_price(exchange, symbol)
         
         # Return None if price is 0 (indicating an error)
         if current_price == 0:
@@ -28,17 +113,57 @@ def scan_market(symbol: str) -> Optional[float]:
         return current_price
         
     except Exception as e:
-        print(f"Error scanning market for {symbol}: {str(e)}")
+        log.error("Error scanning market for %s: %s", symbol, e)
         return None
 
+async def price_stream(
+    symbol: str,
+    min_change: float = PRICE_STREAM_MIN_CHANGE,
+    exchange: Optional[ccxt.okx] = None
+) -> AsyncIterator[Optional[float]]:
+    """
+    Yields prices as the market moves, so callers react to ticker updates
+    instead of sleeping between fixed-interval scans.
+    
+    Args:
+        symbol: Trading pair symbol (e.g., 'BTC/USDT')
+        min_change: Minimum relative move since the last yielded price
+        exchange: Exchange for the REST fallback (see scan_market)
+    
+    Yields:
+        Optional[float]: New price, or None when a scan failed
+    """
+    last_price = None
+    while True:
+        price = await scan_market(symbol, exchange)
+        if not price:
+            yield None
+            await asyncio.sleep(PRICE_STREAM_RETRY_DELAY)
+            continue
+        
+        # Skip ticks that are just noise around the last yielded price
+        if last_price is not None and abs(price - last_price) < last_price * min_change:
+            continue
+        
+        last_price = price
+        yield price
+
+async def _demo(symbol: str) -> Optional[float]:
+    try:
+        return await scan_market(symbol)
+    finally:
+        await close_scanner()
+        await close_shared_session()
+
 if __name__ == "__main__":
     # Example usage
+    logging.basicConfig(level=logging.INFO)
     try:
         # Use the default trading pair from config
         symbol = TradingPairConfig.TRADING_PAIR
         
         # Scan market
-        price = scan_market(symbol)
+        price = asyncio.run(_demo(symbol))
         
         if price is not None:
             print(f"Current price for {symbol}: {price}")
@@ -1,7 +1,38 @@
+import orjson
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Union
 from config import Config, StrategyState
 
+# Количество хедж-уровней; хедж N хранится по индексу N - 1
+HEDGE_COUNT = 3
+
+@dataclass
+class Hedges:
+    """
+    Хедж-позиции в виде параллельных списков фиксированной длины HEDGE_COUNT.
+    """
+    levels: List[float] = field(default_factory=lambda: [0.0] * HEDGE_COUNT)
+    sizes: List[float] = field(default_factory=lambda: [0.0] * HEDGE_COUNT)
+    states: List[bool] = field(default_factory=lambda: [False] * HEDGE_COUNT)
+    entries: List[float] = field(default_factory=lambda: [0.0] * HEDGE_COUNT)
+    # Время входа в хедж - Unix timestamp (секунды)
+    entry_times: List[Optional[float]] = field(default_factory=lambda: [None] * HEDGE_COUNT)
+
+def _hedge_list_from_json(value: Union[List, Dict], default=None) -> List:
+    """Returns a stored hedge field as a list indexed by hedge number - 1.
+    States saved before the list format hold dicts keyed 'h1'..'h3'."""
+    if isinstance(value, dict):
+        return [value.get(f'h{i}', default) for i in range(1, HEDGE_COUNT + 1)]
+    return list(value)
+
+def _entry_time_from_json(value: Union[float, str, None]) -> Optional[float]:
+    """Converts a stored hedge entry time to a Unix timestamp.
+    States saved before timestamps became floats hold ISO-8601 strings."""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return value
+
 class State:
     """
     Manages the complete state of the trading strategy.
@@ -26,15 +57,10 @@ class State:
         # Хеджи
         self.hedges: Dict[str, Dict[str, float]] = {}
         self.prev_hedges: Dict[str, Dict[str, float]] = {}  # Для отслеживания изменений
-        self.hedge_levels: Dict[str, float] = {}
         
-        # Хедж уровни и размеры
-        self.hedge_sizes: Dict[str, float] = {'h1': 0, 'h2': 0, 'h3': 0}
-        self.hedge_states: Dict[str, bool] = {'h1': False, 'h2': False, 'h3': False}
-        self.hedge_entries: Dict[str, float] = {'h1': 0, 'h2': 0, 'h3': 0}
-        self.hedge_entry_times: Dict[str, Optional[datetime]] = {
-            'h1': None, 'h2': None, 'h3': None
-        }
+        # Хедж уровни и размеры - индексируются номером хеджа,
+        # без хеширования ключей 'h1'..'h3' на горячем пути
+        self.hedge_slots: Hedges = Hedges()
         
         # Объемы для комиссий
         self.total_spot_volume: float = 0
@@ -65,16 +91,15 @@ class State:
     def get_total_hedge_value(self) -> float:
         """Calculates total hedge position value"""
         return sum(
-            self.hedge_sizes[k] * self.current_price 
-            for k, active in self.hedge_states.items() 
+            size for size, active in zip(self.hedge_slots.sizes, self.hedge_slots.states)
             if active
-        )
+        ) * self.current_price
     
     def get_active_hedges(self) -> Dict[str, float]:
         """Returns dictionary of active hedge positions"""
         return {
-            k: self.hedge_sizes[k] 
-            for k, active in self.hedge_states.items() 
+            f'h{i}': size
+            for i, (size, active) in enumerate(zip(self.hedge_slots.sizes, self.hedge_slots.states), 1)
             if active
         }
     
@@ -90,19 +115,25 @@ class State:
             "initial_eth": self.initial_eth,
             "current_eth": self.current_eth,
             "current_usd": self.current_usd,
-            "hedge_levels": self.hedge_levels,
-            "hedge_sizes": self.hedge_sizes,
-            "hedge_states": self.hedge_states,
-            "hedge_entries": self.hedge_entries,
-            "hedge_entry_times": {
-                k: v.isoformat() if v else None 
-                for k, v in self.hedge_entry_times.items()
-            },
+            "hedge_levels": list(self.hedge_slots.levels),
+            "hedge_sizes": list(self.hedge_slots.sizes),
+            "hedge_states": list(self.hedge_slots.states),
+            "hedge_entries": list(self.hedge_slots.entries),
+            "hedge_entry_times": list(self.hedge_slots.entry_times),
             "total_spot_volume": self.total_spot_volume,
             "total_futures_volume": self.total_futures_volume,
             "status": self.status.value
         }
     
+    def to_bytes(self) -> bytes:
+        """Serializes state to JSON bytes for persistence and logging"""
+        return orjson.dumps(self.to_dict())
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'State':
+        """Creates State instance from JSON bytes produced by to_bytes"""
+        return cls.from_dict(orjson.loads(data))
+    
     @classmethod
     def from_dict(cls, data: Dict) -> 'State':
         """Creates State instance from dictionary"""
@@ -116,15 +147,41 @@ class State:
         state.initial_eth = data["initial_eth"]
         state.current_eth = data["current_eth"]
         state.current_usd = data["current_usd"]
-        state.hedge_levels = data["hedge_levels"]
-        state.hedge_sizes = data["hedge_sizes"]
-        state.hedge_states = data["hedge_states"]
-        state.hedge_entries = data["hedge_entries"]
-        state.hedge_entry_times = {
-            k: datetime.fromisoformat(v) if v else None 
-            for k, v in data["hedge_entry_times"].items()
-        }
+        state.hedge_slots = Hedges(
+            levels=_hedge_list_from_json(data["hedge_levels"], 0.0),
+            sizes=_hedge_list_from_json(data["hedge_sizes"], 0.0),
+            states=_hedge_list_from_json(data["hedge_states"], False),
+            entries=_hedge_list_from_json(data["hedge_entries"], 0.0),
+            entry_times=[
+                _entry_time_from_json(t)
+                for t in _hedge_list_from_json(data["hedge_entry_times"])
+            ]
+        )
         state.total_spot_volume = data["total_spot_volume"]
         state.total_futures_volume = data["total_futures_volume"]
         state.status = StrategyState(data["status"])
-        return state 
\ No newline at end of file
+        return state
+
+if __name__ == "__main__":
+    # Проверка загрузки состояния, сохраненного в старом формате
+    # (хедж-поля - словари 'h1'..'h3', время входа - ISO-строка)
+    legacy = State().to_dict()
+    legacy.update({
+        "hedge_levels": {},
+        "hedge_sizes": {'h1': 0.5, 'h2': 0, 'h3': 0},
+        "hedge_states": {'h1': True, 'h2': False, 'h3': False},
+        "hedge_entries": {'h1': 2000.0, 'h2': 0, 'h3': 0},
+        "hedge_entry_times": {'h1': '2024-01-01T00:00:00', 'h2': None, 'h3': None}
+    })
+    state = State.from_dict(legacy)
+    assert state.hedge_slots.levels == [0.0, 0.0, 0.0]
+    assert state.hedge_slots.sizes == [0.5, 0, 0]
+    assert state.hedge_slots.states == [True, False, False]
+    assert state.hedge_slots.entries == [2000.0, 0, 0]
+    assert isinstance(state.hedge_slots.entry_times[0], float)
+    assert state.hedge_slots.entry_times[1:] == [None, None]
+    
+    # Повторное сохранение дает текущий формат и читается без изменений
+    restored = State.from_bytes(state.to_bytes())
+    assert restored.hedge_slots == state.hedge_slots
+    print("Legacy state round-trip OK")
@@ -1,7 +1,12 @@
-from datetime import datetime
+import time
 from typing import Dict, Optional
 from config import Config
-from state import State
+from state import State, HEDGE_COUNT
+
+# Уровни хеджей h1, h2, h3 относительно цены входа: -2%, -4%, -6%
+_HEDGE_LEVEL_MULTS = (0.98, 0.96, 0.94)
+# Доли максимального убытка, покрываемые хеджами h1, h2, h3: 20%, 30%, 50%
+_HEDGE_WEIGHTS = (0.2, 0.3, 0.5)
 
 def initialize_strategy(current_price: float, deposit: float) -> State:
     """
@@ -33,11 +38,7 @@ def initialize_strategy(current_price: float, deposit: float) -> State:
     state.current_usd = spot_allocation * 0.5              # Половина в USDT
     
     # Расчет уровней хеджа
-    state.hedge_levels = {
-        'h1': current_price * 0.98,  # -2%
-        'h2': current_price * 0.96,  # -4%
-        'h3': current_price * 0.94   # -6%
-    }
+    state.hedge_slots.levels = [current_price * mult for mult in _HEDGE_LEVEL_MULTS]
     
     return state
 
@@ -50,11 +51,11 @@ def calculate_hedge_sizes(state: State) -> None:
     """
     max_loss = state.current_eth * (state.current_price - state.buffer)
     
-    state.hedge_sizes = {
-        'h1': max_loss * 0.2 / (state.hedge_levels['h1'] - state.buffer),
-        'h2': max_loss * 0.3 / (state.hedge_levels['h2'] - state.buffer),
-        'h3': max_loss * 0.5 / (state.hedge_levels['h3'] - state.buffer)
-    }
+    buffer = state.buffer
+    state.hedge_slots.sizes = [
+        max_loss * weight / (level - buffer)
+        for weight, level in zip(_HEDGE_WEIGHTS, state.hedge_slots.levels)
+    ]
     
     # Валидация плеча
     validate_leverage(state)
@@ -70,8 +71,8 @@ def validate_leverage(state: State) -> bool:
         bool: True если плечо в пределах нормы, иначе ValueError
     """
     total_position_value = sum(
-        size * state.hedge_levels[f'h{i}']
-        for i, size in enumerate(state.hedge_sizes.values(), 1)
+        size * level
+        for size, level in zip(state.hedge_slots.sizes, state.hedge_slots.levels)
     )
     
     hedge_allocation = state.deposit * Config.HEDGE_ALLOCATION
@@ -89,11 +90,10 @@ def manage_hedges(state: State) -> None:
     Args:
         state: Текущее состояние стратегии
     """
-    for i in range(1, 4):
-        hedge_key = f'h{i}'
-        if (state.current_price <= state.hedge_levels[hedge_key] 
-            and not state.hedge_states[hedge_key]):
-            open_hedge(state, i)
+    for i in range(HEDGE_COUNT):
+        if (state.current_price <= state.hedge_slots.levels[i] 
+            and not state.hedge_slots.states[i]):
+            open_hedge(state, i + 1)
 
 def open_hedge(state: State, hedge_num: int) -> None:
     """
@@ -103,15 +103,15 @@ def open_hedge(state: State, hedge_num: int) -> None:
         state: Текущее состояние стратегии
         hedge_num: Номер хедж-позиции (1-3)
     """
-    hedge_key = f'h{hedge_num}'
+    i = hedge_num - 1
     
     # Открытие позиции
-    state.hedge_states[hedge_key] = True
-    state.hedge_entries[hedge_key] = state.current_price
-    state.hedge_entry_times[hedge_key] = datetime.now()
+    state.hedge_slots.states[i] = True
+    state.hedge_slots.entries[i] = state.current_price
+    state.hedge_slots.entry_times[i] = time.time()
     
     # Обновление объема для комиссий
-    position_value = state.hedge_sizes[hedge_key] * state.current_price
+    position_value = state.hedge_slots.sizes[i] * state.current_price
     state.total_futures_volume += position_value
 
 def close_hedge(state: State, hedge_num: int) -> float:
@@ -125,18 +125,18 @@ def close_hedge(state: State, hedge_num: int) -> float:
     Returns:
         float: P&L от закрытия позиции
     """
-    hedge_key = f'h{hedge_num}'
-    if state.hedge_states[hedge_key]:
+    i = hedge_num - 1
+    if state.hedge_slots.states[i]:
         # Расчет P&L
-        size = state.hedge_sizes[hedge_key]
-        entry_price = state.hedge_entries[hedge_key]
+        size = state.hedge_slots.sizes[i]
+        entry_price = state.hedge_slots.entries[i]
         pnl = size * (entry_price - state.current_price)
         
         # Закрытие позиции
-        state.hedge_states[hedge_key] = False
-        state.hedge_sizes[hedge_key] = 0
-        state.hedge_entries[hedge_key] = 0
-        state.hedge_entry_times[hedge_key] = None
+        state.hedge_slots.states[i] = False
+        state.hedge_slots.sizes[i] = 0
+        state.hedge_slots.entries[i] = 0
+        state.hedge_slots.entry_times[i] = None
         
         return pnl
     return 0
@@ -230,12 +230,12 @@ def calculate_delta_hedge(state: State) -> float:
     Returns:
         float: Дельта хедж позиций в USD
     """
-    total_hedge_pnl = 0.0
-    for hedge_num in range(1, 4):
-        hedge_key = f'h{hedge_num}'
-        if state.hedge_states[hedge_key]:
-            size = state.hedge_sizes[hedge_key]
-            entry_price = state.hedge_entries[hedge_key]
-            hedge_pnl = size * (entry_price - state.current_price)
-            total_hedge_pnl += hedge_pnl
-    return total_hedge_pnl 
\ No newline at end of file
+    current_price = state.current_price
+    total_hedge_pnl = sum(
+        size * (entry_price - current_price)
+        for size, entry_price, active in zip(
+            state.hedge_slots.sizes, state.hedge_slots.entries, state.hedge_slots.states
+        )
+        if active
+    )
+    return float(total_hedge_pnl)
\ No newline at end of file